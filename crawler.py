@@ -1,15 +1,28 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import inspect
-import json
+import itertools
 import logging
+import orjson
 import os
 from pathlib import Path
-import re
+try:
+    import re2 as re
+    _compile_linked_issues_regex = re.compile
+except ImportError:
+    import re
+    # \b, \s and \d are ASCII-only in RE2, so they are made ASCII-only here as well
+    _compile_linked_issues_regex = functools.partial(re.compile, flags=re.ASCII)
 import requests
+from requests.adapters import HTTPAdapter
 import signal
-import sys
+import threading
 import time
 
+_request_timeout_secs = 30
+_secondary_ratelimit_default_wait_secs = 60
+
 _base_url = 'https://api.github.com/'
 _pulls_url_template = _base_url + 'repos/{owner}/{repo}/pulls?state=closed&sort=created&direction=asc&per_page={per_page}&page={page}'
 _pull_url_template = _base_url + 'repos/{owner}/{repo}/pulls/{pull_number}'
@@ -20,26 +33,62 @@ _pulls_path_template = os.path.join('{dst_dir}', '{owner}', '{repo}', 'pulls-pag
 _pull_path_template = os.path.join('{dst_dir}', '{owner}', '{repo}', 'pull-{pull_number}.json')
 _issue_path_template = os.path.join('{dst_dir}', '{owner}', '{repo}', 'issue-{issue_number}.json')
 
-_linked_issues_pattern_template = r'\b(?:close|closes|closed|fix|fixes|fixed|resolve|resolves|resolved)\s+(?:https://github\.com/{owner}/{repo}/issues/|{owner}/{repo}#|#)(\d+)\b'
+_linked_issues_keywords_pattern = r'\b(?:close|closes|closed|fix|fixes|fixed|resolve|resolves|resolved)\s+'
+_linked_issues_reference_pattern_template = r'(?:https://github\.com/{owner}/{repo}/issues/|{owner}/{repo}#|#)(\d+)\b'
 
+# The regex is case-sensitive and matches lowercase text only; pull request bodies
+# are lowercased before matching, which is cheaper than case folding in the engine.
+@functools.lru_cache(maxsize=1024)
 def _make_linked_issues_regex(owner, repo):
-    owner = owner.replace('.', r'\.')
-    repo = repo.replace('.', r'\.')
-    pattern = _linked_issues_pattern_template.format(owner=owner, repo=repo)
-    return re.compile(pattern, flags=re.IGNORECASE)
+    owner = owner.lower().replace('.', r'\.')
+    repo = repo.lower().replace('.', r'\.')
+    pattern = _linked_issues_keywords_pattern + _linked_issues_reference_pattern_template.format(owner=owner, repo=repo)
+    return _compile_linked_issues_regex(pattern)
 
 def _extract_linked_issue_numbers(pull_body, linked_issues_regex):
     if pull_body is None:
         return []
-    return [int(n) for n in linked_issues_regex.findall(pull_body)]
+    return [int(n) for n in linked_issues_regex.findall(pull_body.lower())]
+
+def _save_json(obj, path, pretty=False):
+    option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(obj, option=option))
+
+def _save_raw_json(content, path, pretty=False):
+    if pretty:
+        _save_json(orjson.loads(content), path, pretty=True)
+        return
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def _load_json(path):
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
 
-def _save_json(obj, path):
-    with open(path, 'w') as f:
-        json.dump(obj, f, indent=2, sort_keys=True)
+def _load_etag(path):
+    etag_path = path + '.etag'
+    if not os.path.exists(path) or not os.path.exists(etag_path):
+        return None
+    with open(etag_path, 'r') as f:
+        return f.read()
+
+def _save_etag(etag, path):
+    etag_path = path + '.etag'
+    if etag is None:
+        # An ETag saved for an earlier version of the file no longer applies
+        if os.path.exists(etag_path):
+            os.remove(etag_path)
+        return
+    with open(etag_path, 'w') as f:
+        f.write(etag)
 
 def _ensure_dir_exists(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
+# Returned instead of the response body when a conditional request gets a 304
+_not_modified = object()
+
 class TooManyRequestFailures(Exception):
     pass
 
@@ -55,61 +104,101 @@ class Crawler(object):
     will be saved in DEST_DIR/owner/repo. The directories will be created if they
     do not already exist. The naming pattern for files is issue-N.json for issues,
     pull-N.json for pull requests, and pulls-page-N.json for pages of pull
-    requests. Any existing file will be overwritten. The GitHub API limits
+    requests. The ETag of each file is saved in a file with the same name and an
+    additional .etag extension. If a file and its ETag already exist, a conditional
+    request is made, and the file is kept if it has not changed on GitHub. In that
+    case, the linked issues of a pull request that already exist are kept as well.
+    Any other existing file will be overwritten. The GitHub API limits
     unauthenticated clients to 60 requests per hour. The rate limit is 5,000
     requests per hour for authenticated clients. For this reason, you should
     provide a GitHub OAuth token if you want to crawl a large repository. You can
-    create a personal access token at https://github.com/settings/tokens.
+    create a personal access token at https://github.com/settings/tokens. If you
+    provide more than one token, the crawler rotates between them, and a token that
+    reaches its rate limit is skipped until its limit is reset.
 
     Attributes:
         dst_dir (str): Directory for saving JSON files.
         per_page (int): Pull requests per page, between 1 and 100.
         save_pull_pages (bool): Save the pages of pull requests.
+        pretty_json (bool): Save JSON files indented and with sorted keys.
         max_request_tries (int): Number of times to try a request before
             terminating.
         request_retry_wait_secs (int): Seconds to wait before retrying a failed request.
+        max_concurrent_requests (int): Maximum number of requests in flight at the
+            same time.
     """
 
     def __init__(self,
-                 token=None,
+                 tokens=None,
                  dst_dir='repos',
                  per_page=100,
                  save_pull_pages=False,
+                 pretty_json=False,
                  max_request_tries=100,
-                 request_retry_wait_secs=10):
+                 request_retry_wait_secs=10,
+                 max_concurrent_requests=4,
+                 token=None):
         """Initializes Crawler.
 
         The GitHub API limits unauthenticated clients to 60 requests per hour. The
         rate limit is 5,000 requests per hour for authenticated clients. For this
         reason, you should provide a GitHub OAuth token if you want to crawl a large
         repository. You can create a personal access token at
-        https://github.com/settings/tokens.
+        https://github.com/settings/tokens. If you provide more than one token, the
+        crawler rotates between them, and a token that reaches its rate limit is
+        skipped until its limit is reset.
 
         Args:
-            token (str): Your GitHub OAuth token. If None, the crawler will be
-                unauthenticated.
+            tokens (list of str): Your GitHub OAuth tokens. A single token can also
+                be given as a str. If None or empty, and token is None, the crawler
+                will be unauthenticated.
             dst_dir (str): Directory for saving JSON files.
             per_page (int): Pull requests per page, between 1 and 100.
             save_pull_pages (bool): Save the pages of pull requests.
+            pretty_json (bool): Save JSON files indented and with sorted keys. By
+                default, JSON files are saved compact, and issues are saved as
+                received from GitHub.
             max_request_tries (int): Number of times to try a request before
                 terminating.
             request_retry_wait_secs (int): Seconds to wait before retrying a failed request.
+            max_concurrent_requests (int): Maximum number of requests in flight at the
+                same time. The pull requests of a page, and then their linked issues,
+                are fetched concurrently. GitHub's secondary rate limits restrict
+                concurrent requests; when one is hit, all requests wait for the time
+                given by GitHub.
+            token (str): Your GitHub OAuth token. Kept for backward compatibility;
+                it is used in addition to tokens.
         """
         self.dst_dir = dst_dir
         self.per_page = per_page
         self.save_pull_pages = save_pull_pages
+        self.pretty_json = pretty_json
         self.max_request_tries = max_request_tries
         self.request_retry_wait_secs = request_retry_wait_secs
-        self._headers = {
-            'Accept': 'application/vnd.github.v3+json',
-        }
+        self.max_concurrent_requests = max_concurrent_requests
+        self._session = requests.Session()
+        self._session.headers['Accept'] = 'application/vnd.github.v3+json'
+        if isinstance(tokens, str):
+            tokens = [tokens]
+        tokens = list(tokens) if tokens else []
         if token is not None:
-            self._headers['Authorization'] = 'token ' + token
+            tokens.insert(0, token)
+        # A None token makes unauthenticated requests
+        self._tokens = tokens or [None]
+        self._token_cycle = itertools.cycle(self._tokens)
+        self._token_ratelimit_resets = {} # {token: unix time of rate limit reset}
+        # Secondary rate limits apply to all tokens, so all requests wait until this time
+        self._secondary_ratelimit_reset = 0
+        self._ratelimit_lock = threading.Lock()
+        # Keep a connection open for each concurrent request
+        self._session.mount(_base_url, HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent_requests))
         self._interrupted = False
         def sigint_handler(signal, frame):
             if self._interrupted:
-                print('\nForced exit')
-                sys.exit(2)
+                print('\nForced exit', flush=True)
+                # sys.exit would wait for the worker threads, which can be sleeping
+                # through a rate limit, so the process exits right away
+                os._exit(2)
             self._interrupted = True
             print('\nInterrupted, finishing current page\nPress interrupt key again to force exit')
         signal.signal(signal.SIGINT, sigint_handler)
@@ -126,7 +215,11 @@ class Crawler(object):
         will be saved in DEST_DIR/owner/repo. The directories will be created if they
         do not already exist. The naming pattern for files is issue-N.json for issues,
         pull-N.json for pull requests, and pulls-page-N.json for pages of pull
-        requests. Any existing file will be overwritten.
+        requests. The ETag of each file is saved in a file with the same name and an
+        additional .etag extension. If a file and its ETag already exist, a
+        conditional request is made, and the file is kept if it has not changed on
+        GitHub. In that case, the linked issues of a pull request that already exist
+        are kept as well. Any other existing file will be overwritten.
 
         Args:
             owner (str): The username of the repository owner, e.g., "octocat" for the
@@ -145,36 +238,84 @@ class Crawler(object):
         page = start_page
         num_issues = 0
         num_pulls = 0
+        num_unchanged_files = 0
+        fetched_issue_numbers = set()
         self._interrupted = False
-        while not self._interrupted:
-            pulls = self._get(_pulls_url_template.format(per_page=self.per_page, owner=owner, repo=repo, page=page))
-            if self.save_pull_pages:
-                _save_json(pulls, _pulls_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, page=page))
-            for p in pulls:
-                if p['merged_at']:
-                    linked_issue_numbers = _extract_linked_issue_numbers(p.get('body'), linked_issues_regex)
-                    if linked_issue_numbers:
-                        pull_number = p['number']
-                        pull = self._get(_pull_url_template.format(owner=owner, repo=repo, pull_number=pull_number))
-                        pull['linked_issue_numbers'] = linked_issue_numbers
-                        _save_json(pull, _pull_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, pull_number=pull_number))
-                        num_pulls += 1
-                        for issue_number in linked_issue_numbers:
-                            issue = self._get(_issue_url_template.format(owner=owner, repo=repo, issue_number=issue_number))
-                            _save_json(issue, _issue_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, issue_number=issue_number))
-                            num_issues += 1
-            logging.info('Crawl: finished {} {}/{}'.format(page, owner, repo))
-            print('Page {} finished ({}/{})'.format(page, owner, repo))
-            if len(pulls) < self.per_page:
-                logging.info('Crawl: finished all, {} issues {} pulls {}/{}'.format(num_issues, num_pulls, owner, repo))
-                print('All pages finished, saved {} issues and {} pull requests ({}/{})'.format(num_issues, num_pulls, owner, repo))
-                return
-            page += 1
-
-    def _get(self, url):
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            while not self._interrupted:
+                pulls_url = _pulls_url_template.format(per_page=self.per_page, owner=owner, repo=repo, page=page)
+                pulls_path = _pulls_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, page=page)
+                if self.save_pull_pages:
+                    pulls, etag = self._get(pulls_url, etag=_load_etag(pulls_path))
+                    if pulls is _not_modified:
+                        pulls = _load_json(pulls_path)
+                    else:
+                        _save_json(pulls, pulls_path, pretty=self.pretty_json)
+                        _save_etag(etag, pulls_path)
+                else:
+                    pulls, _ = self._get(pulls_url)
+                pulls_linked_issue_numbers = [] # [(pull_number1,linked_issue_numbers1), ...]
+                for p in pulls:
+                    if p['merged_at']:
+                        linked_issue_numbers = _extract_linked_issue_numbers(p.get('body'), linked_issues_regex)
+                        if linked_issue_numbers:
+                            pulls_linked_issue_numbers.append((p['number'], linked_issue_numbers))
+                pull_paths = [_pull_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, pull_number=pull_number)
+                              for pull_number, _ in pulls_linked_issue_numbers]
+                pull_responses = executor.map(self._get,
+                                              [_pull_url_template.format(owner=owner, repo=repo, pull_number=pull_number)
+                                               for pull_number, _ in pulls_linked_issue_numbers],
+                                              itertools.repeat(True),
+                                              [_load_etag(path) for path in pull_paths])
+                not_modified_pull_numbers = set()
+                for (pull_number, linked_issue_numbers), path, (pull, etag) in zip(pulls_linked_issue_numbers, pull_paths, pull_responses):
+                    if pull is _not_modified:
+                        not_modified_pull_numbers.add(pull_number)
+                        num_unchanged_files += 1
+                        continue
+                    pull['linked_issue_numbers'] = linked_issue_numbers
+                    _save_json(pull, path, pretty=self.pretty_json)
+                    _save_etag(etag, path)
+                    num_pulls += 1
+                # An issue can be linked by more than one pull request, or more than once by one
+                # pull request, but it is fetched only once per crawl
+                issue_numbers = []
+                for pull_number, linked_issue_numbers in pulls_linked_issue_numbers:
+                    for issue_number in linked_issue_numbers:
+                        if issue_number in fetched_issue_numbers:
+                            continue
+                        fetched_issue_numbers.add(issue_number)
+                        if pull_number in not_modified_pull_numbers and os.path.exists(_issue_path_template.format(
+                                dst_dir=self.dst_dir, owner=owner, repo=repo, issue_number=issue_number)):
+                            num_unchanged_files += 1
+                            continue
+                        issue_numbers.append(issue_number)
+                issue_paths = [_issue_path_template.format(dst_dir=self.dst_dir, owner=owner, repo=repo, issue_number=issue_number)
+                               for issue_number in issue_numbers]
+                issue_responses = executor.map(self._get,
+                                               [_issue_url_template.format(owner=owner, repo=repo, issue_number=issue_number)
+                                                for issue_number in issue_numbers],
+                                               itertools.repeat(False),
+                                               [_load_etag(path) for path in issue_paths])
+                for path, (issue, etag) in zip(issue_paths, issue_responses):
+                    if issue is _not_modified:
+                        num_unchanged_files += 1
+                        continue
+                    _save_raw_json(issue, path, pretty=self.pretty_json)
+                    _save_etag(etag, path)
+                    num_issues += 1
+                logging.info('Crawl: finished {} {}/{}'.format(page, owner, repo))
+                print('Page {} finished ({}/{})'.format(page, owner, repo))
+                if len(pulls) < self.per_page:
+                    logging.info('Crawl: finished all, {} issues {} pulls {} unchanged {}/{}'.format(num_issues, num_pulls, num_unchanged_files, owner, repo))
+                    print('All pages finished, saved {} issues and {} pull requests, kept {} unchanged files ({}/{})'.format(num_issues, num_pulls, num_unchanged_files, owner, repo))
+                    return
+                page += 1
+
+    def _get(self, url, parse=True, etag=None):
         tries = 0
         while True:
-            r = self._try_to_get(url)
+            r = self._try_to_get(url, parse=parse, etag=etag)
             if r is not None:
                 return r
             tries += 1
@@ -184,26 +325,80 @@ class Crawler(object):
             print('Request failed {} times, retrying in {} seconds'.format(tries, self.request_retry_wait_secs))
             time.sleep(self.request_retry_wait_secs)
 
-    def _try_to_get(self, url):
-        try:
-            r = requests.get(url, headers=self._headers)
-            if not r.ok:
-                logging.error('Get: not ok: {} {} {} {}'.format(url, r.status_code, r.headers, r.text))
-                if 'X-Ratelimit-Remaining' in r.headers and int(r.headers['X-Ratelimit-Remaining']) < 1 and 'X-Ratelimit-Reset' in r.headers:
-                    ratelimit_wait_secs = int(r.headers['X-Ratelimit-Reset']) - int(time.time()) + 1
-                    logging.info('Get: waiting {} secs for rate limit reset'.format(ratelimit_wait_secs))
-                    print('Rate limit reached, waiting {} secs for reset'.format(ratelimit_wait_secs))
-                    time.sleep(ratelimit_wait_secs)
-                    return self._try_to_get(url)
+    def _next_token(self):
+        with self._ratelimit_lock:
+            now = time.time()
+            for _ in range(len(self._tokens)):
+                token = next(self._token_cycle)
+                if self._token_ratelimit_resets.get(token, 0) <= now:
+                    return token
+            return min(self._tokens, key=lambda t: self._token_ratelimit_resets[t])
+
+    # Returns 0 if another token can be used right away
+    def _ratelimit_wait_secs(self, token, ratelimit_reset):
+        with self._ratelimit_lock:
+            self._token_ratelimit_resets[token] = ratelimit_reset
+            now = time.time()
+            if any(self._token_ratelimit_resets.get(t, 0) <= now for t in self._tokens if t != token):
+                return 0
+            earliest_reset = min(self._token_ratelimit_resets.get(t, 0) for t in self._tokens)
+        # The reset time can already have passed on this clock, so wait at least a second
+        return max(earliest_reset - int(now) + 1, 1)
+
+    def _secondary_ratelimit_wait_secs(self, retry_after_secs):
+        with self._ratelimit_lock:
+            self._secondary_ratelimit_reset = max(self._secondary_ratelimit_reset, time.time() + retry_after_secs)
+            return self._secondary_ratelimit_reset - time.time()
+
+    def _wait_for_secondary_ratelimit(self):
+        with self._ratelimit_lock:
+            wait_secs = self._secondary_ratelimit_reset - time.time()
+        if wait_secs > 0:
+            time.sleep(wait_secs)
+
+    # Requests that hit a rate limit are sent again after the wait, in this loop
+    def _try_to_get(self, url, parse=True, etag=None):
+        while True:
+            self._wait_for_secondary_ratelimit()
+            token = self._next_token()
+            headers = {}
+            if token is not None:
+                headers['Authorization'] = 'token ' + token
+            if etag is not None:
+                headers['If-None-Match'] = etag
+            try:
+                r = self._session.get(url, headers=headers, timeout=_request_timeout_secs)
+                if r.status_code == 304:
+                    return _not_modified, etag
+                if not r.ok:
+                    logging.error('Get: not ok: {} {} {} {}'.format(url, r.status_code, r.headers, r.text))
+                    if 'X-Ratelimit-Remaining' in r.headers and int(r.headers['X-Ratelimit-Remaining']) < 1 and 'X-Ratelimit-Reset' in r.headers:
+                        ratelimit_wait_secs = self._ratelimit_wait_secs(token, int(r.headers['X-Ratelimit-Reset']))
+                        if ratelimit_wait_secs > 0:
+                            logging.info('Get: waiting {} secs for rate limit reset'.format(ratelimit_wait_secs))
+                            print('Rate limit reached, waiting {} secs for reset'.format(ratelimit_wait_secs))
+                            time.sleep(ratelimit_wait_secs)
+                        else:
+                            logging.info('Get: rate limit reached, switching token')
+                        continue
+                    if r.status_code in (403, 429) and ('Retry-After' in r.headers or 'secondary rate limit' in r.text.lower()):
+                        # Without Retry-After, GitHub asks clients to wait at least a minute
+                        retry_after_secs = int(r.headers.get('Retry-After', _secondary_ratelimit_default_wait_secs))
+                        ratelimit_wait_secs = self._secondary_ratelimit_wait_secs(retry_after_secs)
+                        logging.info('Get: waiting {:.0f} secs for secondary rate limit'.format(ratelimit_wait_secs))
+                        print('Secondary rate limit reached, waiting {:.0f} secs'.format(ratelimit_wait_secs))
+                        continue
+                    return None
+                if not parse:
+                    return r.content, r.headers.get('ETag')
+                rj = orjson.loads(r.content)
+            except Exception as e:
+                logging.error('Get: exception: {} {}'.format(url, e))
                 return None
-            rj = r.json()
-        except Exception as e:
-            logging.error('Get: exception: {} {}'.format(url, e))
-            return None
-        if isinstance(rj, dict) and 'message' in rj:
-            logging.error('Get: error: {} {}'.format(url, rj))
-            return None
-        return rj
+            if isinstance(rj, dict) and 'message' in rj:
+                logging.error('Get: error: {} {}'.format(url, rj))
+                return None
+            return rj, r.headers.get('ETag')
 
 def main():
     init_params = inspect.signature(Crawler.__init__).parameters
@@ -218,13 +413,20 @@ def main():
                     'The directories will be created if they do not already exist. '
                     'The naming pattern for files is issue-N.json for issues, pull-N.json for pull requests, '
                     'and pulls-page-N.json for pages of pull requests. '
-                    'Any existing file will be overwritten. '
+                    'The ETag of each file is saved in a file with the same name and an additional .etag extension. '
+                    'If a file and its ETag already exist, a conditional request is made, '
+                    'and the file is kept if it has not changed on GitHub. '
+                    'In that case, the linked issues of a pull request that already exist are kept as well. '
+                    'Any other existing file will be overwritten. '
                     'The GitHub API limits unauthenticated clients to 60 requests per hour. '
                     'The rate limit is 5,000 requests per hour for authenticated clients. '
                     'For this reason, you should provide a GitHub OAuth token if you want to crawl a large repository. '
-                    'You can create a personal access token at https://github.com/settings/tokens.')
-    parser.add_argument('-t', '--token', type=str, default=init_params['token'].default,
-        help='your GitHub OAuth token, can also be provided via a GITHUB_OAUTH_TOKEN environment variable')
+                    'You can create a personal access token at https://github.com/settings/tokens. '
+                    'If you provide more than one token, the crawler rotates between them, '
+                    'and a token that reaches its rate limit is skipped until its limit is reset.')
+    parser.add_argument('-t', '--token', type=str, action='append', dest='tokens', metavar='TOKEN', default=init_params['tokens'].default,
+        help='your GitHub OAuth token, can be repeated to rotate between tokens, '
+             'can also be provided via a GITHUB_OAUTH_TOKEN environment variable (comma-separated for more than one token)')
     parser.add_argument('-d', '--dst-dir', type=str, default=init_params['dst_dir'].default,
         help='directory for saving JSON files')
     parser.add_argument('-s', '--start-page', type=int, default=crawl_params['start_page'].default,
@@ -233,30 +435,35 @@ def main():
         help='pull requests per page, between 1 and 100')
     parser.add_argument('-a', '--save-pull-pages', action='store_true',
         help='save the pages of pull requests')
+    parser.add_argument('-j', '--pretty-json', action='store_true',
+        help='save JSON files indented and with sorted keys')
     parser.add_argument('-m', '--max-request-tries', type=int, default=init_params['max_request_tries'].default,
         help='number of times to try a request before terminating')
     parser.add_argument('-r', '--request-retry-wait-secs', type=int, default=init_params['request_retry_wait_secs'].default,
         help='seconds to wait before retrying a failed request')
+    parser.add_argument('-c', '--max-concurrent-requests', type=int, default=init_params['max_concurrent_requests'].default,
+        help='maximum number of requests in flight at the same time')
     parser.add_argument('-l', '--log-file', type=str, default=None,
         help='file to write logs to')
     parser.add_argument('repos', metavar='repo', type=str, nargs='+',
         help='full repository name, e.g., "octocat/Hello-World" for the https://github.com/octocat/Hello-World repository')
     args = parser.parse_args()
 
-    if args.token is None:
-        args.token = os.environ.get('GITHUB_OAUTH_TOKEN')
-    if args.token == '':
-        args.token = None
+    if args.tokens is None:
+        args.tokens = os.environ.get('GITHUB_OAUTH_TOKEN', '').split(',')
+    args.tokens = [t for t in args.tokens if t != '']
 
     if args.log_file is not None:
         logging.basicConfig(filename=args.log_file, filemode='w', level=logging.DEBUG)
 
-    crawler = Crawler(token=args.token,
+    crawler = Crawler(tokens=args.tokens,
                       dst_dir=args.dst_dir,
                       per_page=args.per_page,
                       save_pull_pages=args.save_pull_pages,
+                      pretty_json=args.pretty_json,
                       max_request_tries=args.max_request_tries,
-                      request_retry_wait_secs=args.request_retry_wait_secs)
+                      request_retry_wait_secs=args.request_retry_wait_secs,
+                      max_concurrent_requests=args.max_concurrent_requests)
     for r in args.repos:
         n = r.find('/')
         owner = r[:n]
@@ -1,12 +1,12 @@
 import argparse
-from bs4 import BeautifulSoup
 import calendar
-import csv
-import json
-import markdown
+import functools
+from markdown_it import MarkdownIt
+from multiprocessing import Pool
+import orjson
 import os
+from selectolax.lexbor import LexborHTMLParser
 import sys
-import time
 from tqdm import tqdm
 
 _owner_path_template = os.path.join('{src_dir}', '{owner}')
@@ -35,6 +35,30 @@ _dataset_header = [
     'pull_changed_files',
 ]
 
+_pool_chunksize = 64
+
+_write_buffer_size = 1 << 20
+_write_batch_rows = 4096
+
+_csv_quote_table = str.maketrans({'"': '""'})
+_csv_line_terminator = '\r\n'
+
+_markdown_parser = MarkdownIt('commonmark')
+
+_md_container_open_token_types = {'bullet_list_open', 'ordered_list_open', 'blockquote_open'}
+_md_block_close_token_types = {
+    'paragraph_close',
+    'heading_close',
+    'bullet_list_close',
+    'ordered_list_close',
+    'list_item_close',
+    'blockquote_close',
+    'hr',
+}
+
+# Longer Markdown bodies are converted without caching
+_max_cached_md_len = 64 * 1024
+
 _author_association_value = {
     'COLLABORATOR': 0,
     'CONTRIBUTOR': 1,
@@ -46,7 +70,7 @@ _author_association_value = {
     'OWNER': 7,
 }
 
-def write_dataset(src_dir, dst_file, limit_rows=0):
+def write_dataset(src_dir, dst_file, limit_rows=0, processes=None):
     """Reads JSON files downloaded by the Crawler and writes a CSV file from their
     data.
 
@@ -71,7 +95,10 @@ def write_dataset(src_dir, dst_file, limit_rows=0):
     - pull_changed_files: Integer
     The value of issue_body_plain is converted from issue_body_md. The conversion is
     not always perfect. In some cases, issue_body_plain still contains some Markdown
-    tags.
+    tags. Markdown is parsed according to CommonMark; blocks are separated by
+    newlines as in earlier versions, but where CommonMark and the markdown package
+    parse a body differently (e.g., nested lists indented by two spaces, or lists
+    followed by indented code), the text can differ.
     The value of issue_author_association can be one of the following:
     - 0: Collaborator
     - 1: Contributor
@@ -87,11 +114,14 @@ def write_dataset(src_dir, dst_file, limit_rows=0):
     owner/repo/pull-N.json files. The destination directory of Crawler should
     normally be used as the source directory of Writer. The destination file will be
     overwritten if it already exists.
+    Rows are generated by a pool of worker processes.
 
     Args:
         src_dir (str): Source directory.
         dst_file (str): Destination CSV file.
         limit_rows (int): Maximum number of rows to write.
+        processes (int): Number of worker processes. If None, the number of CPUs is
+            used.
     """
     repo_full_names = []
     repo_num_rows = []
@@ -100,9 +130,9 @@ def write_dataset(src_dir, dst_file, limit_rows=0):
         for r, n in zip(repo_full_names, repo_num_rows):
             print('{}: {:,}'.format(r, n))
         print('Total: {:,}'.format(total_num_rows))
-    with open(dst_file, 'w', newline='') as dataset_file:
-        dataset = csv.writer(dataset_file)
-        dataset.writerow(_dataset_header)
+    with open(dst_file, 'w', newline='', buffering=_write_buffer_size) as dataset_file, Pool(processes) as pool:
+        dataset_file.write(','.join(_dataset_header) + _csv_line_terminator)
+        batch = []
         owner_repo_pairs = _sorted_owner_repo_pairs(src_dir)
         num_repos = len(owner_repo_pairs)
         for i, (owner, repo) in enumerate(owner_repo_pairs):
@@ -110,43 +140,68 @@ def write_dataset(src_dir, dst_file, limit_rows=0):
             repo_full_names.append(repo_full_name)
             repo_num_rows.append(0)
             print('{} ({:,}/{:,})'.format(repo_full_name, i + 1, num_repos))
-            for pull_number in tqdm(_sorted_pull_numbers(src_dir, owner, repo)):
-                pull = _read_json(_pull_path_template.format(src_dir=src_dir, owner=owner, repo=repo, pull_number=pull_number))
-                pull['linked_issue_numbers'].sort()
-                for issue_number in pull['linked_issue_numbers']:
-                    issue = _read_json(_issue_path_template.format(src_dir=src_dir, owner=owner, repo=repo, issue_number=issue_number))
-                    dataset.writerow(_dataset_row(issue, pull))
+            pulls = [(src_dir, owner, repo, n) for n in _sorted_pull_numbers(src_dir, owner, repo)]
+            # imap, unlike imap_unordered, keeps the rows sorted
+            for lines in tqdm(pool.imap(_pull_dataset_lines, pulls, chunksize=_pool_chunksize), total=len(pulls)):
+                for line in lines:
+                    batch.append(line)
                     repo_num_rows[i] += 1
                     total_num_rows += 1
                     if total_num_rows == limit_rows:
+                        dataset_file.write(''.join(batch))
                         print('Limit of {:,} rows reached'.format(limit_rows))
                         print_results()
                         return
+                if len(batch) >= _write_batch_rows:
+                    dataset_file.write(''.join(batch))
+                    batch.clear()
+        dataset_file.write(''.join(batch))
     print('Finished')
     print_results()
 
 def _sorted_owner_repo_pairs(src_dir):
     pairs = [] # [(owner1,repo1), (owner2,repo2)]
-    owners = os.listdir(src_dir)
-    owners.sort()
-    for owner in owners:
-        repos = os.listdir(_owner_path_template.format(src_dir=src_dir, owner=owner))
-        repos.sort()
-        for repo in repos:
+    for owner in _sorted_dir_names(src_dir):
+        for repo in _sorted_dir_names(_owner_path_template.format(src_dir=src_dir, owner=owner)):
             pairs.append((owner, repo))
     return pairs
 
+def _sorted_dir_names(path):
+    with os.scandir(path) as entries:
+        names = [e.name for e in entries if e.is_dir()]
+    names.sort()
+    return names
+
 def _sorted_pull_numbers(src_dir, owner, repo):
-    filenames = os.listdir(_repo_path_template.format(src_dir=src_dir, owner=owner, repo=repo))
-    pull_numbers = [int(f[5:-5]) for f in filenames if f.startswith('pull-')]
+    with os.scandir(_repo_path_template.format(src_dir=src_dir, owner=owner, repo=repo)) as entries:
+        pull_numbers = [int(e.name[5:-5]) for e in entries if e.name.startswith('pull-') and e.name.endswith('.json')]
     pull_numbers.sort()
     return pull_numbers
 
+def _pull_dataset_lines(args: tuple) -> list:
+    src_dir, owner, repo, pull_number = args
+    pull = _read_json(_pull_path_template.format(src_dir=src_dir, owner=owner, repo=repo, pull_number=pull_number))
+    pull['linked_issue_numbers'].sort()
+    lines = []
+    for issue_number in pull['linked_issue_numbers']:
+        issue = _read_issue_json(_issue_path_template.format(src_dir=src_dir, owner=owner, repo=repo, issue_number=issue_number))
+        lines.append(_csv_line(_dataset_row(issue, pull)))
+    return lines
+
+# Text fields are always quoted, and other fields are never quoted
+def _csv_line(row: list) -> str:
+    return ','.join(['"' + v.translate(_csv_quote_table) + '"' if isinstance(v, str) else str(v) for v in row]) + _csv_line_terminator
+
 def _read_json(path):
-    with open(path, 'r') as f:
-        return json.load(f)
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+# An issue can be linked by more than one pull request
+@functools.lru_cache(maxsize=2048)
+def _read_issue_json(path):
+    return _read_json(path)
 
-def _dataset_row(issue, pull):
+def _dataset_row(issue: dict, pull: dict) -> list:
     if issue.get('body') is None:
         issue_body_md = ''
         issue_body_plain = ''
@@ -175,14 +230,57 @@ def _dataset_row(issue, pull):
         pull['changed_files'],
     ]
 
-def _md_to_text(md):
-    html = markdown.markdown(md)
-    soup = BeautifulSoup(html, features='html.parser')
-    return soup.get_text()
+def _md_to_text(md: str) -> str:
+    if len(md) <= _max_cached_md_len:
+        return _cached_md_to_text(md)
+    return _uncached_md_to_text(md)
+
+@functools.lru_cache(maxsize=4096)
+def _cached_md_to_text(md: str) -> str:
+    return _uncached_md_to_text(md)
+
+# Newlines are placed where they were in the text of the HTML rendered by the
+# markdown package: after each block, and after the start of each list, list item
+# with blocks, and block quote
+def _uncached_md_to_text(md: str) -> str:
+    text = []
+    tokens = _markdown_parser.parse(md)
+    for i, token in enumerate(tokens):
+        if token.type == 'inline':
+            for child in token.children or []:
+                if child.type == 'text' or child.type == 'code_inline':
+                    text.append(child.content)
+                elif child.type == 'softbreak' or child.type == 'hardbreak':
+                    text.append('\n')
+        elif token.type in _md_container_open_token_types:
+            text.append('\n')
+        elif token.type == 'list_item_open':
+            if i + 1 < len(tokens) and not tokens[i + 1].hidden:
+                text.append('\n')
+        elif token.type in _md_block_close_token_types:
+            if not token.hidden:
+                text.append('\n')
+        elif token.type == 'code_block':
+            text.append(token.content + '\n')
+        elif token.type == 'fence':
+            # The markdown package rendered fences as inline code in a paragraph
+            text.append(token.content)
+        elif token.type == 'html_block':
+            text.append(_html_to_text(token.content.rstrip('\n')) + '\n')
+    # The text of the rendered HTML did not end with the newline after the last block
+    if text and text[-1].endswith('\n'):
+        text[-1] = text[-1][:-1]
+    return ''.join(text)
+
+# The text of script and style elements is not part of the text, as with BeautifulSoup
+def _html_to_text(html: str) -> str:
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(['script', 'style'])
+    return tree.text()
 
-def _iso_to_unix(iso):
-    utc_time = time.strptime(iso, '%Y-%m-%dT%H:%M:%SZ')
-    return calendar.timegm(utc_time)
+# GitHub timestamps are always in the YYYY-MM-DDTHH:MM:SSZ format
+def _iso_to_unix(iso: str) -> int:
+    return calendar.timegm((int(iso[0:4]), int(iso[5:7]), int(iso[8:10]), int(iso[11:13]), int(iso[14:16]), int(iso[17:19])))
 
 def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -192,12 +290,14 @@ def main():
                     'The destination file will be overwritten if it already exists.')
     parser.add_argument('-l', '--limit-rows', type=int, default=0,
         help='limit number of rows to write, ignored if non-positive')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+        help='number of worker processes, defaults to the number of CPUs')
     parser.add_argument('src_dir', type=str,
         help='source directory')
     parser.add_argument('dst_file', type=str,
         help='destination CSV file')
     args = parser.parse_args()
-    write_dataset(args.src_dir, args.dst_file, limit_rows=args.limit_rows)
+    write_dataset(args.src_dir, args.dst_file, limit_rows=args.limit_rows, processes=args.processes)
 
 if __name__ == '__main__':
     main()